@@ -1,4 +1,5 @@
 import sys
+import math
 import time
 import threading
 import pygame
@@ -24,6 +25,15 @@ YELLOW = (255, 255, 0)
 # Player colors
 PLAYER_COLORS = [RED, GREEN, BLUE, YELLOW]
 
+# Maximum number of waiting messages handled in one network loop iteration
+MAX_MESSAGE_BATCH = 64
+
+# Angle step (in degrees) between cached tank sprites
+TANK_ANGLE_STEP = 5
+
+# Angles (in degrees) of the axis-aligned directions, which need no trigonometry
+AXIS_ANGLES = {(1, 0): 0, (0, 1): 90, (-1, 0): 180, (0, -1): 270}
+
 class GameClient:
     """
     The game client that connects to the server and renders the game.
@@ -46,16 +56,44 @@ class GameClient:
         self.network = NetworkManager(False)
         self.player_id = None
         self.game_state = None
+        self.static_map = None  # Map data, sent only with JOIN and START messages
+        self._state_tick = -1  # Tick of the last state received from the server
         self.running = False
         self.connected = False
         self.game_started = False
         self.game_ended = False
         self.winner = None
 
+        # Input is sent at most once per server tick
+        self._input_interval = 1.0 / 60
+        self._next_input_send = 0.0
+        self._action_messages = {}  # Action messages keyed by the combination of actions
+
+        # Pre-rendered static map, rebuilt only when the walls change
+        self._map_surface = None
+        self._map_walls = None
+
+        # Rotated tank sprites keyed by (color index, angle bucket)
+        self._tank_sprites = {}
+
+        # Cached surfaces of the game end screen
+        self._end_overlay = None
+        self._end_text_surface = None
+        self._end_text_winner = None
+
+        # Static texts, rendered once the display exists (see _init_screen)
+        self._waiting_text = None
+        self._button_text = None
+
+        # What was shown by the last rendered frame (None until the first frame)
+        self._rendered_state = None
+        self._rendered_game_ended = None
+
         # Initialize pygame
         pygame.init()
         self.screen = None
         self.clock = pygame.time.Clock()
+        self._last_frame_time = 0.0
         self.font = pygame.font.SysFont('Arial', 20)
         self.big_font = pygame.font.SysFont('Arial', 32)
 
@@ -76,12 +114,18 @@ class GameClient:
             })
             self.network.send_message(join_message)
 
-            # Wait for response
-            for _ in range(50):  # Try for 5 seconds
-                message, _ = self.network.receive_message()
+            # Wait for response, for up to 5 seconds
+            timeout = 5.0
+            deadline = time.monotonic() + timeout
+            while timeout > 0:
+                message, _ = self.network.receive_message(timeout=timeout)
+                timeout = deadline - time.monotonic()
+
                 if message and message.msg_type == MSG_TYPE_JOIN:
                     if message.data.get('success', False):
                         self.player_id = message.data.get('player_id')
+                        self._input_interval = 1.0 / message.data.get('tick_rate', 60)
+                        self.static_map = message.data.get('map')
                         self.connected = True
                         print(f"Connected to server as player {self.player_id}")
                         return True
@@ -89,7 +133,6 @@ class GameClient:
                         reason = message.data.get('reason', 'Unknown reason')
                         print(f"Failed to join game: {reason}")
                         return False
-                time.sleep(0.1)
 
             print("Timed out waiting for server response")
             return False
@@ -138,12 +181,23 @@ class GameClient:
         The network loop that receives messages from the server.
         """
         while self.running:
-            message, _ = self.network.receive_message()
+            # Wait for data, waking up periodically to notice shutdown, then drain the
+            # messages that are already waiting, so a backlog is handled at once
+            batch = self.network.receive_messages_batch(MAX_MESSAGE_BATCH, timeout=0.5)
+            if not batch:
+                continue
+            messages = [message for message, _ in batch]
 
-            if message:
-                self._process_message(message)
+            # A full state replaces everything before it, so earlier states can be skipped
+            last_full_state = -1
+            for i, message in enumerate(messages):
+                if message.msg_type == MSG_TYPE_STATE and not message.data.get('delta', False):
+                    last_full_state = i
 
-            time.sleep(0.001)  # Small sleep to reduce CPU usage
+            for i, message in enumerate(messages):
+                if i < last_full_state and message.msg_type == MSG_TYPE_STATE:
+                    continue
+                self._process_message(message)
 
     def _process_message(self, message):
         """
@@ -153,8 +207,19 @@ class GameClient:
             message (NetworkMessage): The message to process.
         """
         if message.msg_type == MSG_TYPE_STATE:
-            self.game_state = message.data
+            # Ignore states that arrived out of order
+            tick = message.data.get('tick', 0)
+            if tick < self._state_tick:
+                return
+            self._state_tick = tick
+
+            if message.data.get('delta', False):
+                self._apply_state_delta(message.data)
+            else:
+                self.game_state = message.data
         elif message.msg_type == MSG_TYPE_START:
+            self.static_map = message.data.get('map', self.static_map)
+            self._state_tick = -1  # Ticks start over with every game
             self.game_started = True
             self.game_ended = False
             self.winner = None
@@ -172,6 +237,33 @@ class GameClient:
                 self.player_id = message.data.get('player_id')
                 print(f"Player ID updated from {old_player_id} to {self.player_id}")
 
+    def _apply_state_delta(self, delta):
+        """
+        Merge the changed player fields of a delta state into the current game state.
+
+        Args:
+            delta (dict): The delta state received from the server.
+        """
+        # Deltas can only be applied on top of a full state
+        if not self.game_state:
+            return
+
+        players = list(self.game_state.get('players', []))
+        for changed in delta.get('players', []):
+            i = changed.pop('i', None)
+            if i is None or i >= len(players):
+                continue
+            player = dict(players[i])
+            player.update(changed)
+            players[i] = player
+
+        # Replace the whole state so the render thread never sees a partial update
+        self.game_state = {
+            'tick': delta.get('tick'),
+            'players': players,
+            'is_running': delta.get('is_running', False)
+        }
+
     def send_restart_request(self):
         """
         Send a restart request to the server.
@@ -185,22 +277,14 @@ class GameClient:
         """
         The main game loop that handles input and rendering.
         """
-        # Initialize screen
-        if self.game_state:
-            map_size = self.game_state.get('map', {}).get('size', (20, 20))
-            screen_width = map_size[0] * self.cell_size
-            screen_height = map_size[1] * self.cell_size
-        else:
-            screen_width = 600
-            screen_height = 600
-
-        self.screen = pygame.display.set_mode((screen_width, screen_height))
-        pygame.display.set_caption(f"Czolgi - {self.player_name}")
+        self._init_screen()
 
         # Main loop
         while self.running:
             # Handle events
+            had_event = False
             for event in pygame.event.get():
+                had_event = True
                 if event.type == pygame.QUIT:
                     self.running = False
                 elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -209,50 +293,132 @@ class GameClient:
                         mouse_pos = pygame.mouse.get_pos()
                         if self.restart_button_rect.collidepoint(mouse_pos):
                             self.send_restart_request()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                    # Fire once per key press
+                    if self._can_act():
+                        self.network.send_message(self._get_action_message((None, None, 'fire')))
 
             # Handle input
             self._handle_input()
 
-            # Render game
-            self._render()
+            # Render game, only if there is something new to show
+            if (had_event or self.game_state is not self._rendered_state or
+                    self.game_ended != self._rendered_game_ended):
+                self._render()
+                self._rendered_state = self.game_state
+                self._rendered_game_ended = self.game_ended
 
-            # Cap at 60 FPS
-            self.clock.tick(60)
+            # Cap at 60 FPS, or 10 FPS while the window is in the background
+            self._wait_for_next_frame(60 if pygame.key.get_focused() else 10)
 
-    def _handle_input(self):
+    def _wait_for_next_frame(self, fps):
+        """
+        Wait until the next frame is due. Sleeps through most of the wait and only
+        busy-waits for the last millisecond, since sleeping alone can overshoot by several ms.
+
+        Args:
+            fps (int): The frame rate to keep.
         """
-        Handle user input.
+        remaining = self._last_frame_time + 1.0 / fps - time.perf_counter()
+        if remaining > 0.002:
+            time.sleep(remaining - 0.001)
+
+        self.clock.tick_busy_loop(fps)
+        self._last_frame_time = time.perf_counter()
+
+    def _init_screen(self):
+        """
+        Create the game window and the surfaces that are drawn on it every frame.
+        """
+        if self.static_map:
+            map_size = self.static_map.get('size', (20, 20))
+            screen_width = map_size[0] * self.cell_size
+            screen_height = map_size[1] * self.cell_size
+        else:
+            screen_width = 600
+            screen_height = 600
+
+        self.screen = pygame.display.set_mode((screen_width, screen_height))
+        pygame.display.set_caption(f"Czolgi - {self.player_name}")
+
+        # Semi-transparent overlay for the game end screen
+        overlay = pygame.Surface(self.screen.get_size(), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 180))  # Black with alpha
+        self._end_overlay = overlay.convert_alpha()
+
+        # Static texts, rendered once since font rendering is slow
+        self._waiting_text = self.font.render("Waiting for game to start...", True, WHITE).convert_alpha()
+        self._button_text = self.font.render("Restart Game", True, BLACK).convert_alpha()
+
+    def _can_act(self):
+        """
+        Check if the player can send actions (the game is running and the player is alive).
+
+        Returns:
+            bool: True if the player can act, False otherwise.
         """
         if not self.game_started or not self.game_state or self.player_id is None:
-            return
+            return False
 
         # Get player state
         players = self.game_state.get('players', [])
-        if self.player_id >= len(players) or not players[self.player_id].get('is_alive', False):
+        return self.player_id < len(players) and players[self.player_id].get('is_alive', False)
+
+    def _handle_input(self):
+        """
+        Handle held keys for movement and rotation. Firing is handled by KEYDOWN events.
+        """
+        if not self._can_act():
+            return
+
+        # The server cannot apply more than one action of each kind per tick
+        now = time.perf_counter()
+        if now < self._next_input_send:
             return
 
         keys = pygame.key.get_pressed()
 
         # Movement
         if keys[pygame.K_w]:
-            action = {'type': 'move_forward'}
-            self.network.send_message(NetworkMessage(MSG_TYPE_ACTION, action))
+            move = 'move_forward'
         elif keys[pygame.K_s]:
-            action = {'type': 'move_backward'}
-            self.network.send_message(NetworkMessage(MSG_TYPE_ACTION, action))
+            move = 'move_backward'
+        else:
+            move = None
 
         # Rotation
         if keys[pygame.K_d]:
-            action = {'type': 'turn_left'}
-            self.network.send_message(NetworkMessage(MSG_TYPE_ACTION, action))
+            turn = 'turn_left'
         elif keys[pygame.K_a]:
-            action = {'type': 'turn_right'}
-            self.network.send_message(NetworkMessage(MSG_TYPE_ACTION, action))
+            turn = 'turn_right'
+        else:
+            turn = None
+
+        # Send all actions of this frame in a single message
+        if move or turn:
+            self.network.send_message(self._get_action_message((move, turn, None)))
+            # Schedule against the previous slot so the average rate matches the tick rate,
+            # but never less than half an interval from now
+            self._next_input_send = max(self._next_input_send + self._input_interval,
+                                        now + self._input_interval / 2)
+
+    def _get_action_message(self, action_types):
+        """
+        Get the action message for a combination of actions, creating it on first use.
+
+        Args:
+            action_types (tuple): Action types, with None for actions that are not taken.
 
-        # Fire
-        if keys[pygame.K_SPACE]:
-            action = {'type': 'fire'}
-            self.network.send_message(NetworkMessage(MSG_TYPE_ACTION, action))
+        Returns:
+            NetworkMessage: The action message.
+        """
+        message = self._action_messages.get(action_types)
+        if message is None:
+            message = NetworkMessage(MSG_TYPE_ACTION, {
+                'actions': [{'type': action_type} for action_type in action_types if action_type]
+            })
+            self._action_messages[action_types] = message
+        return message
 
     def _render(self):
         """
@@ -266,7 +432,7 @@ class GameClient:
 
         if not self.game_state:
             # Render waiting message
-            text = self.font.render("Waiting for game to start...", True, WHITE)
+            text = self._waiting_text
             text_rect = text.get_rect(center=(self.screen.get_width() // 2, self.screen.get_height() // 2))
             self.screen.blit(text, text_rect)
         else:
@@ -289,18 +455,19 @@ class GameClient:
         """
         Render the game end screen with a restart button.
         """
-        # Create a semi-transparent overlay
-        overlay = pygame.Surface((self.screen.get_width(), self.screen.get_height()), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))  # Black with alpha
-        self.screen.blit(overlay, (0, 0))
-
-        # Render game end message
-        if self.winner:
-            message = f"Game Over! Winner: {self.winner}"
-        else:
-            message = "Game Over!"
-
-        text = self.big_font.render(message, True, WHITE)
+        # Darken the game with the semi-transparent overlay
+        self.screen.blit(self._end_overlay, (0, 0))
+
+        # Render game end message, only when the winner changes
+        if self._end_text_surface is None or self._end_text_winner != self.winner:
+            if self.winner:
+                message = f"Game Over! Winner: {self.winner}"
+            else:
+                message = "Game Over!"
+            self._end_text_surface = self.big_font.render(message, True, WHITE)
+            self._end_text_winner = self.winner
+
+        text = self._end_text_surface
         text_rect = text.get_rect(center=(self.screen.get_width() // 2, self.screen.get_height() // 2 - 50))
         self.screen.blit(text, text_rect)
 
@@ -317,7 +484,7 @@ class GameClient:
         pygame.draw.rect(self.screen, WHITE, self.restart_button_rect, 2)  # Border
 
         # Button text
-        button_text = self.font.render("Restart Game", True, BLACK)
+        button_text = self._button_text
         button_text_rect = button_text.get_rect(center=self.restart_button_rect.center)
         self.screen.blit(button_text, button_text_rect)
 
@@ -325,21 +492,39 @@ class GameClient:
         """
         Render the game map.
         """
-        if not self.game_state:
+        if not self.static_map:
             return
 
-        map_data = self.game_state.get('map', {})
-        walls = map_data.get('walls', [])
+        walls = self.static_map.get('walls', [])
+
+        # Walls don't change during a match, so draw them once and reuse the surface.
+        # A new map always arrives as a new list, so an identity check is enough and
+        # avoids comparing every wall on every frame
+        if self._map_surface is None or walls is not self._map_walls:
+            self._map_surface = self._build_map_surface(walls)
+            self._map_walls = walls
+
+        self.screen.blit(self._map_surface, (0, 0))
+
+    def _build_map_surface(self, walls):
+        """
+        Draw the walls onto a new surface the size of the screen.
 
+        Args:
+            walls (list): List of wall positions as (x, y).
+
+        Returns:
+            pygame.Surface: The pre-rendered map.
+        """
+        surface = pygame.Surface(self.screen.get_size()).convert()
+        surface.fill(BLACK)
+
+        # Walls are solid axis-aligned cells, so fill() is enough and cheaper than draw.rect()
         for wall_pos in walls:
             x, y = wall_pos
-            rect = pygame.Rect(
-                x * self.cell_size,
-                y * self.cell_size,
-                self.cell_size,
-                self.cell_size
-            )
-            pygame.draw.rect(self.screen, WHITE, rect)
+            surface.fill(WHITE, (x * self.cell_size, y * self.cell_size, self.cell_size, self.cell_size))
+
+        return surface
 
     def _render_players(self):
         """
@@ -361,30 +546,13 @@ class GameClient:
             center_x = position[0] * self.cell_size + self.cell_size // 2
             center_y = position[1] * self.cell_size + self.cell_size // 2
 
-            # Draw player as a rectangle with a line indicating direction
-            color = PLAYER_COLORS[i % len(PLAYER_COLORS)]
-            rect_width = self.cell_size - 4
-            rect_height = self.cell_size - 4
-
-            # Calculate angle from direction vector (in degrees)
-            import math
-            angle_rad = math.atan2(direction[1], direction[0])
-            angle_deg = math.degrees(angle_rad)
-
-            # Create a surface for the tank
-            tank_surface = pygame.Surface((rect_width, rect_height), pygame.SRCALPHA)
-            tank_surface.fill((0, 0, 0, 0))  # Transparent background
+            # Calculate angle from direction vector, rounded to the sprite cache step
+            angle_bucket = AXIS_ANGLES.get(tuple(direction))
+            if angle_bucket is None:
+                angle_deg = math.degrees(math.atan2(direction[1], direction[0]))
+                angle_bucket = int(round(angle_deg / TANK_ANGLE_STEP) * TANK_ANGLE_STEP) % 360
 
-            # Draw the rectangle on the surface
-            pygame.draw.rect(tank_surface, color, pygame.Rect(0, 0, rect_width, rect_height))
-
-            # Draw the direction line (barrel) on the surface
-            pygame.draw.line(tank_surface, BLACK, 
-                            (rect_width // 2, rect_height // 2), 
-                            (rect_width, rect_height // 2), 3)
-
-            # Rotate the surface
-            rotated_surface = pygame.transform.rotate(tank_surface, -angle_deg)  # Negative for clockwise rotation
+            rotated_surface = self._get_tank_sprite(i % len(PLAYER_COLORS), angle_bucket)
 
             # Get the rect of the rotated surface and position it
             rotated_rect = rotated_surface.get_rect(center=(center_x, center_y))
@@ -392,6 +560,44 @@ class GameClient:
             # Draw the rotated tank
             self.screen.blit(rotated_surface, rotated_rect.topleft)
 
+    def _get_tank_sprite(self, color_idx, angle_bucket):
+        """
+        Get the tank sprite for a color and angle, rendering it on first use.
+
+        Args:
+            color_idx (int): Index into PLAYER_COLORS.
+            angle_bucket (int): The tank angle in degrees, a multiple of TANK_ANGLE_STEP.
+
+        Returns:
+            pygame.Surface: The rotated tank sprite.
+        """
+        key = (color_idx, angle_bucket)
+        sprite = self._tank_sprites.get(key)
+        if sprite is not None:
+            return sprite
+
+        # Draw player as a rectangle with a line indicating direction
+        color = PLAYER_COLORS[color_idx]
+        rect_width = self.cell_size - 4
+        rect_height = self.cell_size - 4
+
+        # Create a surface for the tank
+        tank_surface = pygame.Surface((rect_width, rect_height), pygame.SRCALPHA)
+        tank_surface.fill((0, 0, 0, 0))  # Transparent background
+
+        # Draw the rectangle on the surface
+        pygame.draw.rect(tank_surface, color, pygame.Rect(0, 0, rect_width, rect_height))
+
+        # Draw the direction line (barrel) on the surface
+        pygame.draw.line(tank_surface, BLACK, 
+                        (rect_width // 2, rect_height // 2), 
+                        (rect_width, rect_height // 2), 3)
+
+        # Rotate the surface
+        sprite = pygame.transform.rotate(tank_surface, -angle_bucket).convert_alpha()  # Negative for clockwise rotation
+        self._tank_sprites[key] = sprite
+        return sprite
+
     def _render_bullets(self):
         """
         Render the bullets.
@@ -1,3 +1,7 @@
+# Distance from a player's center within which a bullet hits the player
+PLAYER_HIT_RADIUS = 0.5 ** 0.5
+
+
 class Bullet:
     """
     Represents a bullet fired by a player.
@@ -22,13 +26,16 @@ class Bullet:
         self.speed = speed
         self.life_time = 0
 
-    def update(self, game_map, players):
+    def update(self, game_map, players, player_hash=None):
         """
         Update the bullet's position and check for collisions.
 
         Args:
             game_map (Map): The game map to check for wall collisions.
             players (list): List of Player objects to check for player collisions.
+            player_hash (SpatialHash): Optional index of the alive players, holding
+                (player index, Player) items. If given, only players in the cells
+                around the bullet are checked.
 
         Returns:
             bool: True if the bullet is still active, False if it should be removed.
@@ -39,21 +46,26 @@ class Bullet:
         # Increment lifetime
         self.life_time += 1
 
+        # Work on local copies of the bullet and map state in this hot path
+        x, y = self.position
+        dx, dy = self.direction
+        speed = self.speed
+        wall_grid = game_map.wall_grid
+        width, height = game_map.size
+
         # Move the bullet
-        new_x = self.position[0] + self.direction[0] * self.speed
-        new_y = self.position[1] + self.direction[1] * self.speed
-        new_position = (new_x, new_y)
+        new_x = x + dx * speed
+        new_y = y + dy * speed
 
         # Round positions for wall collision checks
         round_new_x = round(new_x)
         round_new_y = round(new_y)
-        round_current_x = round(self.position[0])
-        round_current_y = round(self.position[1])
 
-        # Check for wall collision
-        if not game_map.is_position_valid(round_new_x, round_new_y):
-            # Handle bounce
-            dx, dy = self.direction
+        # Check for wall collision (same test as Map.is_position_valid, inlined)
+        if (not ((round_new_x | round_new_y) >= 0 and round_new_x < width and round_new_y < height) or
+                wall_grid[round_new_x][round_new_y]):
+            round_current_x = round(x)
+            round_current_y = round(y)
 
             # Check which wall was hit (horizontal or vertical)
             hit_horizontal = game_map.is_wall_at(round_current_x, round_new_y)
@@ -61,13 +73,14 @@ class Bullet:
 
             if hit_horizontal and not hit_vertical:
                 # Horizontal wall (top/bottom), reverse y direction
-                self.direction = (dx, -dy)
+                dy = -dy
             elif hit_vertical and not hit_horizontal:
                 # Vertical wall (left/right), reverse x direction
-                self.direction = (-dx, dy)
+                dx = -dx
             else:
                 # Corner case or both walls, reverse both
-                self.direction = (-dx, -dy)
+                dx, dy = -dx, -dy
+            self.direction = (dx, dy)
 
             self.bounces += 1
 
@@ -76,32 +89,35 @@ class Bullet:
                 return False
 
             # Recalculate new position after bounce
-            dx, dy = self.direction
-            new_x = self.position[0] + dx * self.speed
-            new_y = self.position[1] + dy * self.speed
-            new_position = (new_x, new_y)
-
-            # Round for wall check
-            round_new_x = round(new_x)
-            round_new_y = round(new_y)
+            new_x = x + dx * speed
+            new_y = y + dy * speed
 
             # If still in a wall after bounce, despawn
-            if not game_map.is_position_valid(round_new_x, round_new_y):
+            if not game_map.is_position_valid(round(new_x), round(new_y)):
                 return False
 
         # Update position
-        self.position = new_position
+        self.position = (new_x, new_y)
+
+        if player_hash is not None:
+            nearby = player_hash.query(new_x, new_y, PLAYER_HIT_RADIUS)
+            # Keep the players list order, so the same player is hit as without the index
+            nearby.sort(key=lambda entry: entry[0])
+            players = [player for _, player in nearby]
 
-        # Check for player collision
+        # Check for player collision (same test as collision_with_player, inlined)
+        owner_protected = self.life_time < 30
         for player in players:
             # Skip collision with the owner of the bullet only if less than 0.5 seconds (30 ticks) have passed
-            if player is self.owner and self.life_time < 30:
+            if owner_protected and player is self.owner:
                 continue
 
-            if player.is_alive and self.collision_with_player(player):
-                self.hit = True
-                player.is_alive = False
-                return False
+            if player.is_alive:
+                player_x, player_y = player.position
+                if (new_x - player_x) ** 2 + (new_y - player_y) ** 2 < 0.5:
+                    self.hit = True
+                    player.is_alive = False
+                    return False
 
         return True
 
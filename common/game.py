@@ -1,8 +1,14 @@
+import math
 import random
 import time
 from common.map import Map
 from common.player import Player
 from common.bullet import Bullet
+from common.spatial_hash import SpatialHash
+
+# Number of players plus bullets from which bullets look up nearby players
+# in a spatial hash instead of checking every player
+SPATIAL_HASH_MIN_OBJECTS = 32
 
 class Game:
     """
@@ -27,6 +33,16 @@ class Game:
         self.is_running = False
         self.start_time = None
         self.current_tick = 0
+        self._player_hash = SpatialHash()  # Alive players by cell, rebuilt each tick when used
+
+        # Player states sent in the previous delta state, and how often to send a full state
+        self._last_players = None
+        self.keyframe_interval = tick_rate
+
+        # Two state dicts that delta states are built in by turns, so the previous
+        # player states stay intact to compare with while the next ones are written
+        self._state_buffers = ({}, {})
+        self._state_buffer_index = 0
 
     def add_player(self, name, ip_address=None):
         """
@@ -46,7 +62,6 @@ class Game:
         position = self._find_spawn_position()
 
         # Random initial direction using angle
-        import math
         angle = random.uniform(0, 2 * math.pi)  # Random angle between 0 and 2π
         direction = (math.cos(angle), math.sin(angle))
 
@@ -142,7 +157,7 @@ class Game:
             # Find a new spawn position
             player.position = self._find_spawn_position()
             player.is_alive = True
-            player.bullets = []  # Clear bullets
+            player.clear_bullets()
 
         # Reset game state
         self.is_running = True
@@ -178,66 +193,150 @@ class Game:
         Update the game state for one tick.
 
         Returns:
-            bool: True if the game is still running, False if it has ended.
+            tuple: (running, winner), running is True if the game is still running and
+                False if it has ended. winner is the Player who won when the game ended
+                on this tick, None otherwise (or if nobody survived).
         """
         if not self.is_running:
-            return False
+            return False, None
 
         self.current_tick += 1
 
+        game_map = self.map
+        players = self.players
+
+        # With many objects, index the alive players by cell so bullets only check nearby players
+        player_hash = None
+        if len(players) + sum(player.bullet_count for player in players) >= SPATIAL_HASH_MIN_OBJECTS:
+            player_hash = self._player_hash
+            player_hash.clear()
+            for i, player in enumerate(players):
+                if player.is_alive:
+                    player_hash.insert(player.position[0], player.position[1], (i, player))
+
         # Update all players and their bullets
-        for player in self.players:
+        for player in players:
             if not player.is_alive:
                 continue
 
             # Update player state
             player.update()
 
-            # Update player's bullets
-            active_bullets = []
-            for bullet in player.bullets:
-                if bullet.update(self.map, self.players):
-                    active_bullets.append(bullet)
-            player.bullets = active_bullets
+            # Update player's bullets, removing the ones that are gone
+            player.update_bullets(game_map, players, player_hash)
 
         # Check game end condition
-        alive_count = sum(1 for p in self.players if p.is_alive)
-        if alive_count <= 1:
+        alive_players = [p for p in self.players if p.is_alive]
+        if len(alive_players) <= 1:
+            # The surviving player is the winner, if there is one (players who
+            # left are in defeated_players too, so it can't be taken from there)
             self.end_game()
-            return False
+            return False, alive_players[0] if alive_players else None
 
-        return True
+        return True, None
 
-    def get_state(self):
+    def get_state(self, delta=False):
         """
         Get the current game state.
 
+        Positions and directions are rounded to keep the serialized state small.
+        With delta=True only the player fields that changed since the previous
+        delta call are included, except for every keyframe_interval-th tick
+        (or when players joined or left), which is sent as a full state.
+
+        Args:
+            delta (bool): True to get the changes since the previous delta state.
+
         Returns:
-            dict: The current game state.
+            dict: The current game state, or the changes with 'delta' set to True.
         """
+        if not delta:
+            return self.get_state_into({})
+
+        # Fill the state dict that isn't holding the previous player states
+        self._state_buffer_index ^= 1
+        state = self.get_state_into(self._state_buffers[self._state_buffer_index])
+        players = state['players']
+
+        last_players = self._last_players
+        self._last_players = players
+
+        # Send a full state as a keyframe, so clients recover from lost packets.
+        # It is copied, since the buffer is overwritten by a later call
+        if (last_players is None or len(last_players) != len(players) or
+                self.current_tick % self.keyframe_interval == 0):
+            return {
+                'tick': state['tick'],
+                'players': [dict(player) for player in players],
+                'is_running': state['is_running']
+            }
+
+        changes = []
+        for i, (player, last_player) in enumerate(zip(players, last_players)):
+            changed = {key: value for key, value in player.items() if last_player[key] != value}
+            if changed:
+                changed['i'] = i
+                changes.append(changed)
+
         return {
             'tick': self.current_tick,
-            'map': {
-                'size': self.map.size,
-                'walls': self.map.walls_list
-            },
-            'players': [
+            'delta': True,
+            'players': changes,
+            'is_running': self.is_running
+        }
+
+    def get_state_into(self, state):
+        """
+        Write the current game state into an existing dict, reusing the dicts of
+        its player states instead of building new ones, see get_state.
+
+        Args:
+            state (dict): The dict to fill, empty or from an earlier call.
+
+        Returns:
+            dict: The filled state dict.
+        """
+        state['tick'] = self.current_tick
+        players_state = state.get('players')
+        if players_state is None:
+            players_state = state['players'] = []
+        state['is_running'] = self.is_running
+
+        # Keep one player state dict for each player
+        players = self.players
+        del players_state[len(players):]
+        while len(players_state) < len(players):
+            players_state.append({})
+
+        for player, player_state in zip(players, players_state):
+            position = player.position
+            direction = player.direction
+            player_state['name'] = player.name
+            player_state['position'] = (round(position[0], 2), round(position[1], 2))
+            player_state['direction'] = (round(direction[0], 3), round(direction[1], 3))
+            player_state['is_alive'] = player.is_alive
+            # A new list, since delta states keep a reference to the previous one
+            player_state['bullets'] = [
                 {
-                    'name': player.name,
-                    'position': player.position,
-                    'direction': player.direction,
-                    'is_alive': player.is_alive,
-                    'bullets': [
-                        {
-                            'position': bullet.position,
-                            'direction': bullet.direction
-                        }
-                        for bullet in player.bullets
-                    ]
+                    'position': (round(bullet.position[0], 2), round(bullet.position[1], 2)),
+                    'direction': (round(bullet.direction[0], 3), round(bullet.direction[1], 3))
                 }
-                for player in self.players
-            ],
-            'is_running': self.is_running
+                for bullet in player.bullets
+            ]
+
+        return state
+
+    def get_map_state(self):
+        """
+        Get the static map data. The map doesn't change during a game, so it is
+        sent once with the JOIN and START messages instead of with every state.
+
+        Returns:
+            dict: The map size and wall positions.
+        """
+        return {
+            'size': self.map.size,
+            'walls': self.map.walls_list
         }
 
     def process_player_action(self, player_id, action):
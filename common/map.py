@@ -1,3 +1,7 @@
+import random
+from collections import deque
+
+
 class Map:
     """
     Represents the game map with walls and obstacles.
@@ -12,7 +16,35 @@ class Map:
         """
         self.size = size
         self.name = name
-        self.walls_list = []
+        self._width, self._height = size  # Unpacked for the bounds checks
+        self.wall_grid = self._empty_grid()
+        self._walls_list = None  # Cached list of wall positions, built from wall_grid
+
+    @property
+    def walls_list(self):
+        """
+        List of all wall positions, derived from the wall grid and cached until the walls change.
+
+        Returns:
+            list: The wall positions as (x, y) tuples.
+        """
+        if self._walls_list is None:
+            self._walls_list = [
+                (x, y)
+                for x, column in enumerate(self.wall_grid)
+                for y, is_wall in enumerate(column)
+                if is_wall
+            ]
+        return self._walls_list
+
+    def _empty_grid(self):
+        """
+        Create a grid without walls, indexed as grid[x][y].
+
+        Returns:
+            list: A list of columns of booleans, True where there is a wall.
+        """
+        return [[False] * self.size[1] for _ in range(self.size[0])]
 
     def add_wall(self, x, y):
         """
@@ -22,7 +54,21 @@ class Map:
             x (int): The x-coordinate of the wall.
             y (int): The y-coordinate of the wall.
         """
-        self.walls_list.append((x, y))
+        if not self.wall_grid[x][y]:
+            self.wall_grid[x][y] = True
+            self._walls_list = None
+
+    def remove_wall(self, x, y):
+        """
+        Remove the wall at the specified position, if there is one.
+
+        Args:
+            x (int): The x-coordinate of the wall.
+            y (int): The y-coordinate of the wall.
+        """
+        if self.is_wall_at(x, y):
+            self.wall_grid[x][y] = False
+            self._walls_list = None
 
     def is_wall_at(self, x, y):
         """
@@ -35,7 +81,8 @@ class Map:
         Returns:
             bool: True if there is a wall at the position, False otherwise.
         """
-        return (x, y) in self.walls_list
+        # (x | y) is negative if either coordinate is, one comparison for both lower bounds
+        return (x | y) >= 0 and x < self._width and y < self._height and self.wall_grid[x][y]
 
     def is_position_valid(self, x, y):
         """
@@ -48,9 +95,11 @@ class Map:
         Returns:
             bool: True if the position is valid, False otherwise.
         """
-        return (0 <= x < self.size[0] and 
-                0 <= y < self.size[1] and 
-                not self.is_wall_at(x, y))
+        # (x | y) is negative if either coordinate is, one comparison for both lower bounds
+        return ((x | y) >= 0 and
+                x < self._width and
+                y < self._height and
+                not self.wall_grid[x][y])
 
     def is_rectangle_valid(self, center_x, center_y, width, height):
         """
@@ -65,21 +114,38 @@ class Map:
         Returns:
             bool: True if the rectangle is valid, False otherwise.
         """
-        # Calculate the half-width and half-height
-        half_width = width / 2
-        half_height = height / 2
+        return self.is_rectangle_valid_offsets(center_x, center_y, (width / 2, height / 2))
+
+    def is_rectangle_valid_offsets(self, center_x, center_y, offsets):
+        """
+        Check if a rectangle is valid, given the corner offsets from its center.
+        Callers that always check the same rectangle size precompute the offsets once.
+
+        Args:
+            center_x (float): The x-coordinate of the rectangle's center.
+            center_y (float): The y-coordinate of the rectangle's center.
+            offsets (tuple): The half-width and half-height of the rectangle.
+
+        Returns:
+            bool: True if the rectangle is valid, False otherwise.
+        """
+        half_width, half_height = offsets
+
+        # The four corners share two x and two y coordinates
+        left = round(center_x - half_width)
+        right = round(center_x + half_width)
+        top = round(center_y - half_height)
+        bottom = round(center_y + half_height)
 
-        # Check all four corners of the rectangle
-        top_left = (round(center_x - half_width), round(center_y - half_height))
-        top_right = (round(center_x + half_width), round(center_y - half_height))
-        bottom_left = (round(center_x - half_width), round(center_y + half_height))
-        bottom_right = (round(center_x + half_width), round(center_y + half_height))
+        # Check if all corners are within map bounds
+        if left < 0 or top < 0 or right >= self._width or bottom >= self._height:
+            return False
 
-        # Check if all corners are valid positions
-        return (self.is_position_valid(top_left[0], top_left[1]) and
-                self.is_position_valid(top_right[0], top_right[1]) and
-                self.is_position_valid(bottom_left[0], bottom_left[1]) and
-                self.is_position_valid(bottom_right[0], bottom_right[1]))
+        # Check if none of the corners is in a wall
+        left_column = self.wall_grid[left]
+        right_column = self.wall_grid[right]
+        return not (left_column[top] or left_column[bottom] or
+                    right_column[top] or right_column[bottom])
 
     def generate_random_map(self, wall_density=0.3):
         """
@@ -88,146 +154,162 @@ class Map:
         Args:
             wall_density (float): The density of walls (0.0 to 1.0).
         """
-        import random
-        from collections import deque
+        width, height = self.size
+        rand = random.random
+
+        # Build the grid a column at a time: walls around the perimeter,
+        # random walls inside
+        inner_cells = range(1, height - 1)
+        self.wall_grid = [
+            [True] * height if x == 0 or x == width - 1 else
+            [True] + [rand() < wall_density for _ in inner_cells] + [True]
+            for x in range(width)
+        ]
+        self._walls_list = None
 
-        # Clear existing walls
-        self.walls_list = []
+        # Ensure all areas are connected
+        self._ensure_connectivity()
 
-        # Add walls around the perimeter
-        for x in range(self.size[0]):
-            self.add_wall(x, 0)
-            self.add_wall(x, self.size[1] - 1)
+    def _find_connected_cells(self, starts, visited=None):
+        """
+        Find all open cells reachable from the start cells, using a breadth-first search.
+        Visited cells are marked in a grid rather than a set, so no (x, y) tuple is
+        hashed for each step.
 
-        for y in range(self.size[1]):
-            self.add_wall(0, y)
-            self.add_wall(self.size[0] - 1, y)
+        Args:
+            starts (list): The (x, y) open cells to start from.
+            visited (list): Optional grid of the cells found by an earlier search, which
+                is extended in place. Cells already marked in it are not searched again.
 
-        # Add random walls inside
-        for x in range(1, self.size[0] - 1):
-            for y in range(1, self.size[1] - 1):
-                if random.random() < wall_density:
-                    self.add_wall(x, y)
+        Returns:
+            tuple: (visited, cells), a grid indexed as visited[x][y] that is True for
+                the reachable cells, and the newly reached cells as a list of (x, y)
+                tuples, including the start cells.
+        """
+        wall_grid = self.wall_grid
+        max_x = self.size[0] - 1
+        max_y = self.size[1] - 1
 
-        # Ensure all areas are connected
-        self._ensure_connectivity()
+        if visited is None:
+            visited = self._empty_grid()
+
+        cells = []
+        for x, y in starts:
+            if not visited[x][y]:
+                visited[x][y] = True
+                cells.append((x, y))
+        queue = deque(cells)
+
+        # Perform BFS to find all connected cells
+        while queue:
+            x, y = queue.popleft()
+
+            # Adjacent cells (up, right, down, left)
+            for nx, ny in ((x - 1, y), (x, y + 1), (x + 1, y), (x, y - 1)):
+                # Check if the adjacent cell is within bounds and not a wall
+                if (0 < nx < max_x and 
+                    0 < ny < max_y and 
+                    not wall_grid[nx][ny] and 
+                    not visited[nx][ny]):
+                    visited[nx][ny] = True
+                    cells.append((nx, ny))
+                    queue.append((nx, ny))
+
+        return visited, cells
 
     def _ensure_connectivity(self):
         """
         Ensure that all open spaces in the map are connected.
         Uses a breadth-first search to identify disconnected regions and removes walls to connect them.
         """
-        from collections import deque
-        import random
+        wall_grid = self.wall_grid
 
         # Find all open cells (non-wall cells)
-        open_cells = []
-        for x in range(1, self.size[0] - 1):
-            for y in range(1, self.size[1] - 1):
-                if not self.is_wall_at(x, y):
-                    open_cells.append((x, y))
+        open_cells = [
+            (x, y)
+            for x in range(1, self.size[0] - 1)
+            for y in range(1, self.size[1] - 1)
+            if not wall_grid[x][y]
+        ]
 
         if not open_cells:
             return  # No open cells, nothing to connect
 
         # Start BFS from the first open cell
-        start = open_cells[0]
-        visited = {start}
-        queue = deque([start])
-
-        # Directions for adjacent cells (up, right, down, left)
-        directions = [(-1, 0), (0, 1), (1, 0), (0, -1)]
-
-        # Perform BFS to find all connected cells
-        while queue:
-            x, y = queue.popleft()
-
-            for dx, dy in directions:
-                nx, ny = x + dx, y + dy
-
-                # Check if the adjacent cell is within bounds and not a wall
-                if (0 < nx < self.size[0] - 1 and 
-                    0 < ny < self.size[1] - 1 and 
-                    not self.is_wall_at(nx, ny) and 
-                    (nx, ny) not in visited):
-                    visited.add((nx, ny))
-                    queue.append((nx, ny))
+        visited, connected = self._find_connected_cells([open_cells[0]])
 
         # Find all disconnected cells
-        disconnected = [cell for cell in open_cells if cell not in visited]
+        disconnected = {(x, y) for x, y in open_cells if not visited[x][y]}
 
         # Connect disconnected regions by removing walls
         while disconnected:
-            # Find the closest pair of connected and disconnected cells
-            min_distance = float('inf')
-            wall_to_remove = None
-            connected_cell = None
-            disconnected_cell = None
-
-            for c_cell in visited:
-                for d_cell in disconnected:
-                    # Manhattan distance between cells
-                    distance = abs(c_cell[0] - d_cell[0]) + abs(c_cell[1] - d_cell[1])
-
-                    if distance < min_distance:
-                        min_distance = distance
-                        connected_cell = c_cell
-                        disconnected_cell = d_cell
-
-            if min_distance == 1:
-                # Cells are adjacent, just remove the wall between them
-                wall_x = (connected_cell[0] + disconnected_cell[0]) // 2
-                wall_y = (connected_cell[1] + disconnected_cell[1]) // 2
-
-                # Remove the wall
-                if (wall_x, wall_y) in self.walls_list:
-                    self.walls_list.remove((wall_x, wall_y))
-            else:
-                # Find a path between the cells and remove a wall along that path
-                path_x = connected_cell[0]
-                path_y = connected_cell[1]
-
-                # Move horizontally first
-                while path_x != disconnected_cell[0]:
-                    if path_x < disconnected_cell[0]:
-                        path_x += 1
-                    else:
-                        path_x -= 1
-
-                    # If we hit a wall, remove it
-                    if self.is_wall_at(path_x, path_y):
-                        self.walls_list.remove((path_x, path_y))
-                        break
-
-                # If we haven't removed a wall yet, move vertically
-                if not self.is_wall_at(path_x, path_y):
-                    while path_y != disconnected_cell[1]:
-                        if path_y < disconnected_cell[1]:
-                            path_y += 1
-                        else:
-                            path_y -= 1
-
-                        # If we hit a wall, remove it
-                        if self.is_wall_at(path_x, path_y):
-                            self.walls_list.remove((path_x, path_y))
-                            break
-
-            # Run BFS again from the first open cell to find all connected cells
-            visited = {start}
-            queue = deque([start])
-
-            while queue:
-                x, y = queue.popleft()
-
-                for dx, dy in directions:
-                    nx, ny = x + dx, y + dy
-
-                    if (0 < nx < self.size[0] - 1 and 
-                        0 < ny < self.size[1] - 1 and 
-                        not self.is_wall_at(nx, ny) and 
-                        (nx, ny) not in visited):
-                        visited.add((nx, ny))
+            # Remove the walls on the cheapest path from the connected area to a disconnected cell
+            removed_walls = self._find_walls_to_nearest(connected, disconnected)
+            for wall_x, wall_y in removed_walls:
+                self.remove_wall(wall_x, wall_y)
+
+            # Only the removed walls and the regions they opened up are newly connected,
+            # so continue the search from them instead of searching the whole map again
+            visited, newly_connected = self._find_connected_cells(removed_walls, visited)
+            connected.extend(newly_connected)
+            disconnected.difference_update(newly_connected)
+
+    def _find_walls_to_nearest(self, sources, targets):
+        """
+        Find the path from any source cell to any target cell that crosses the fewest walls.
+        Uses a multi-source 0-1 breadth-first search: stepping onto an open cell costs 0,
+        stepping onto an (inner) wall costs 1.
+
+        Args:
+            sources (list): Open (x, y) cells to start from.
+            targets (set): Open (x, y) cells to reach.
+
+        Returns:
+            list: The (x, y) walls on the path, empty if no target can be reached.
+        """
+        wall_grid = self.wall_grid
+        width, height = self.size
+        max_x = width - 1
+        max_y = height - 1
+
+        # Costs and parents are kept in grids indexed [x][y], like wall_grid,
+        # so the search doesn't hash an (x, y) tuple for every step
+        unreached = width * height + 1  # More than the cost of any path
+        cost = [[unreached] * height for _ in range(width)]
+        parent = [[None] * height for _ in range(width)]
+        for x, y in sources:
+            cost[x][y] = 0
+        queue = deque(sources)
+
+        while queue:
+            cell = queue.popleft()
+
+            if cell in targets:
+                # Walk back to a source, collecting the walls on the way
+                walls = []
+                while cell is not None:
+                    x, y = cell
+                    if wall_grid[x][y]:
+                        walls.append(cell)
+                    cell = parent[x][y]
+                return walls
+
+            x, y = cell
+            cell_cost = cost[x][y]
+
+            # Adjacent cells (up, right, down, left), the perimeter is never opened
+            for nx, ny in ((x - 1, y), (x, y + 1), (x + 1, y), (x, y - 1)):
+                if not (0 < nx < max_x and 0 < ny < max_y):
+                    continue
+
+                is_wall = wall_grid[nx][ny]
+                new_cost = cell_cost + 1 if is_wall else cell_cost
+                if new_cost < cost[nx][ny]:
+                    cost[nx][ny] = new_cost
+                    parent[nx][ny] = cell
+                    if is_wall:
                         queue.append((nx, ny))
+                    else:
+                        queue.appendleft((nx, ny))
 
-            # Update the list of disconnected cells
-            disconnected = [cell for cell in open_cells if cell not in visited]
+        return []
@@ -1,7 +1,30 @@
 import json
+import selectors
 import socket
 import struct
 import time
+from collections import deque
+
+# orjson is optional: it produces the same compact JSON, but much faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(data):
+    """Serialize data to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data):
+    """Parse UTF-8 JSON from bytes or a memoryview."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
 
 # Message types
 MSG_TYPE_JOIN = 1
@@ -13,6 +36,16 @@ MSG_TYPE_END = 6
 MSG_TYPE_READY = 7
 MSG_TYPE_RESTART = 8
 
+# Largest possible UDP payload, the size of the receive buffer
+MAX_DATAGRAM_SIZE = 65535
+
+# Version of the message format, messages with another version are dropped
+PROTOCOL_VERSION = 1
+
+# Message header: protocol version, message type and data length in bytes
+_HEADER = struct.Struct('!BBI')
+_HEADER_SIZE = _HEADER.size
+
 class NetworkMessage:
     """
     Represents a network message for communication between client and server.
@@ -21,6 +54,16 @@ class NetworkMessage:
         """
         Initialize a new network message.
 
+        Args:
+            msg_type (int): The type of message.
+            data (dict): The message data.
+        """
+        self.reset(msg_type, data)
+
+    def reset(self, msg_type, data=None):
+        """
+        Reinitialize the message with a new type and data, so it can be reused.
+
         Args:
             msg_type (int): The type of message.
             data (dict): The message data.
@@ -28,22 +71,27 @@ class NetworkMessage:
         self.msg_type = msg_type
         self.data = data or {}
         self.timestamp = time.time()
+        self._bytes = None  # Serialized message, cached by to_bytes
 
     def to_bytes(self):
         """
         Convert the message to bytes for network transmission.
+        The result is cached, so the data must not be changed after the first call.
 
         Returns:
             bytes: The message as bytes.
         """
-        # Convert data to JSON string
-        json_data = json.dumps(self.data)
+        if self._bytes is None:
+            # Convert data to compact JSON (no whitespace after separators)
+            json_data = _json_dumps(self.data)
+
+            # Create message header (message type and data length in bytes)
+            header = _HEADER.pack(PROTOCOL_VERSION, self.msg_type, len(json_data))
 
-        # Create message header (message type and data length)
-        header = struct.pack('!BI', self.msg_type, len(json_data))
+            # Combine header and data
+            self._bytes = header + json_data
 
-        # Combine header and data
-        return header + json_data.encode('utf-8')
+        return self._bytes
 
     @staticmethod
     def from_bytes(data):
@@ -51,33 +99,80 @@ class NetworkMessage:
         Create a NetworkMessage from bytes.
 
         Args:
-            data (bytes): The message bytes.
+            data (bytes): The message bytes (or a memoryview of them).
 
         Returns:
             NetworkMessage: The created message, or None if the data is invalid.
         """
         try:
-            # Extract header (message type and data length)
-            header_size = struct.calcsize('!BI')
-            if len(data) < header_size:
+            # Extract header (protocol version, message type and data length)
+            if len(data) < _HEADER_SIZE:
                 return None
 
-            msg_type, data_length = struct.unpack('!BI', data[:header_size])
+            version, msg_type, data_length = _HEADER.unpack_from(data)
+
+            # Drop stale or malformed packets before trying to parse them
+            if version != PROTOCOL_VERSION or data_length > len(data) - _HEADER_SIZE:
+                return None
 
             # Extract and parse JSON data
-            json_data = data[header_size:header_size + data_length].decode('utf-8')
-            message_data = json.loads(json_data)
+            message_data = _json_loads(data[_HEADER_SIZE:_HEADER_SIZE + data_length])
 
             return NetworkMessage(msg_type, message_data)
         except Exception as e:
+            # Backstop for a valid header with invalid JSON data
             print(f"Error parsing message: {e}")
             return None
 
+class MessagePool:
+    """
+    Pool of reusable NetworkMessage objects, so sending a message doesn't allocate a new one.
+    """
+    def __init__(self, size=64):
+        """
+        Initialize the pool with preallocated messages.
+
+        Args:
+            size (int): The number of messages to preallocate, and the most the pool keeps.
+        """
+        self._free = deque((NetworkMessage(0) for _ in range(size)), maxlen=size)
+
+    def acquire(self, msg_type, data=None):
+        """
+        Get a message from the pool, or a new one if the pool is empty.
+
+        Args:
+            msg_type (int): The type of message.
+            data (dict): The message data.
+
+        Returns:
+            NetworkMessage: The message, to be given back with release once it was sent.
+        """
+        try:
+            message = self._free.pop()
+        except IndexError:
+            return NetworkMessage(msg_type, data)
+
+        message.reset(msg_type, data)
+        return message
+
+    def release(self, message):
+        """
+        Give a sent message back to the pool. It must not be used after this.
+
+        Args:
+            message (NetworkMessage): The message to return.
+        """
+        # Drop the references to the data, so it can be freed while the message waits in the pool
+        message.data = None
+        message._bytes = None
+        self._free.append(message)
+
 class NetworkManager:
     """
     Manages network communication for the game.
     """
-    def __init__(self, is_server, host='0.0.0.0', port=12345):
+    def __init__(self, is_server, host='0.0.0.0', port=12345, reuse_port=False):
         """
         Initialize the network manager.
 
@@ -85,15 +180,29 @@ class NetworkManager:
             is_server (bool): True if this is the server, False for client.
             host (str): The host address to bind to.
             port (int): The port to use.
+            reuse_port (bool): True to let several server sockets bind the same port
+                (SO_REUSEPORT), so the kernel spreads the clients over them.
         """
         self.is_server = is_server
         self.host = host
         self.port = port
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.clients = {}  # Maps client address to player ID (server only)
+        self._client_addresses = ()  # Snapshot of the client addresses, replaced when clients change
+
+        # Preallocated receive buffer, so received data is parsed without copying it
+        self._recv_buffer = bytearray(MAX_DATAGRAM_SIZE)
+        self._recv_view = memoryview(self._recv_buffer)
+
+        # Persistent selector (epoll on Linux) to check if a datagram is waiting
+        # before reading it, instead of raising BlockingIOError on every empty poll
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.socket, selectors.EVENT_READ)
 
         # Set socket options
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
 
         # Bind socket
         if is_server:
@@ -108,38 +217,104 @@ class NetworkManager:
             message (NetworkMessage): The message to send.
             address (tuple): The address to send to (client only).
         """
+        # Serialize once, even when broadcasting to several clients
+        self.send_prepared(message.to_bytes(), address)
+
+    def send_prepared(self, message_bytes, address=None):
+        """
+        Send an already serialized message to a client or the server.
+
+        Args:
+            message_bytes (bytes): The message, as returned by NetworkMessage.to_bytes.
+            address (tuple): The address to send to. For the server, None broadcasts
+                to all clients; for a client, None sends to the server.
+        """
         if self.is_server:
             if address is None:
-                # Broadcast to all clients
-                for client_address in self.clients:
-                    self.socket.sendto(message.to_bytes(), client_address)
+                self.broadcast_prepared(message_bytes)
             else:
                 # Send to specific client
-                self.socket.sendto(message.to_bytes(), address)
+                self.socket.sendto(message_bytes, address)
         else:
             # Client sends to server
             if address is None:
                 address = (self.host, self.port)
-            self.socket.sendto(message.to_bytes(), address)
+            self.socket.sendto(message_bytes, address)
+
+    def broadcast_prepared(self, message_bytes):
+        """
+        Send an already serialized message to all clients (server only).
 
-    def receive_message(self):
+        Args:
+            message_bytes (bytes): The message, as returned by NetworkMessage.to_bytes.
+        """
+        # The snapshot is replaced rather than changed, so clients may join from another thread
+        sendto = self.socket.sendto
+        for client_address in self._client_addresses:
+            sendto(message_bytes, client_address)
+
+    def receive_message(self, timeout=None):
         """
         Receive a message from the network.
 
+        Args:
+            timeout (float): Seconds to wait for a message to arrive. If None,
+                return immediately when no message is available.
+
         Returns:
             tuple: (NetworkMessage, address) or (None, None) if no message is available.
         """
         try:
-            data, address = self.socket.recvfrom(4096)
-            message = NetworkMessage.from_bytes(data)
+            # Wait up to the timeout (or not at all) for the socket to become readable
+            if not self._selector.select(0 if timeout is None else timeout):
+                return None, None
+
+            size, address = self.socket.recvfrom_into(self._recv_buffer)
+            message = NetworkMessage.from_bytes(self._recv_view[:size])
             return message, address
         except BlockingIOError:
-            # No data available
+            # Readable, but the datagram was gone by the time it was read
             return None, None
         except Exception as e:
             print(f"Error receiving message: {e}")
             return None, None
 
+    def receive_messages_batch(self, max_n=32, timeout=None):
+        """
+        Receive all waiting messages, up to max_n, after a single readiness check.
+        The socket must be non-blocking.
+
+        Args:
+            max_n (int): The maximum number of messages to receive.
+            timeout (float): Seconds to wait for the first message to arrive. If None,
+                return immediately when no message is available.
+
+        Returns:
+            list: (NetworkMessage, address) tuples, empty if no message is available.
+                Invalid messages are skipped.
+        """
+        messages = []
+        try:
+            if not self._selector.select(0 if timeout is None else timeout):
+                return messages
+
+            # Drain the socket until it is empty, the buffer is reused
+            # because each message is parsed before the next one is read
+            recv_into = self.socket.recvfrom_into
+            recv_buffer = self._recv_buffer
+            recv_view = self._recv_view
+            for _ in range(max_n):
+                size, address = recv_into(recv_buffer)
+                message = NetworkMessage.from_bytes(recv_view[:size])
+                if message is not None:
+                    messages.append((message, address))
+        except BlockingIOError:
+            # No more data available
+            pass
+        except Exception as e:
+            print(f"Error receiving message: {e}")
+        return messages
+
     def connect_to_server(self, server_host, server_port):
         """
         Connect to the game server (client only).
@@ -178,6 +353,7 @@ class NetworkManager:
         """
         if self.is_server:
             self.clients[address] = player_id
+            self._client_addresses = tuple(self.clients)
 
     def remove_client(self, address):
         """
@@ -192,6 +368,7 @@ class NetworkManager:
         if self.is_server and address in self.clients:
             player_id = self.clients[address]
             del self.clients[address]
+            self._client_addresses = tuple(self.clients)
             return player_id
         return None
 
@@ -199,4 +376,5 @@ class NetworkManager:
         """
         Close the network connection.
         """
+        self._selector.close()
         self.socket.close()
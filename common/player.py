@@ -1,7 +1,20 @@
+import math
+
+from common.bullet import Bullet
+
+
 class Player:
     """
     Represents a player (tank) in the game.
     """
+    # Fixed attribute layout: faster attribute access and smaller instances
+    __slots__ = (
+        'name', 'is_alive', 'position', 'direction', '_angle', 'ip_address',
+        'width', 'height', '_hitbox_offsets', 'movement_speed', 'rotation_speed',
+        'move_cooldown', 'rotate_cooldown', 'move_cooldown_max', 'rotate_cooldown_max',
+        'fire_cooldown', 'fire_cooldown_max', 'max_bullets', '_bullet_slots', '_free_mask',
+    )
+
     def __init__(self, name, position=(0, 0), direction=(1, 0), ip_address=None):
         """
         Initialize a new player.
@@ -16,12 +29,13 @@ class Player:
         self.is_alive = True
         self.position = position
         self.direction = direction
-        self.bullets = []
+        self._angle = math.atan2(direction[1], direction[0])  # Angle of direction in radians
         self.ip_address = ip_address
 
         # Tank dimensions for hitbox
         self.width = 0.6  # Width of the tank in cells
         self.height = 0.6  # Height of the tank in cells
+        self._hitbox_offsets = (self.width / 2, self.height / 2)  # Corner offsets from the center
 
         # Movement and rotation speed parameters
         self.movement_speed = 0.07  # Cells per tick
@@ -38,6 +52,38 @@ class Player:
         self.fire_cooldown_max = 60  # Ticks between shots (60 ticks = 1 second at 60 tick rate)
         self.max_bullets = 5  # Maximum number of bullets a player can have active at once
 
+        # Active bullets in a fixed number of slots, with a bitmask of the free slots,
+        # so firing and removing bullets doesn't resize a list
+        self._bullet_slots = [None] * self.max_bullets
+        self._free_mask = (1 << self.max_bullets) - 1
+
+    @property
+    def bullets(self):
+        """
+        List of the player's active bullets.
+
+        Returns:
+            list: The active Bullet objects, in slot order.
+        """
+        return [bullet for bullet in self._bullet_slots if bullet is not None]
+
+    @property
+    def bullet_count(self):
+        """
+        Number of the player's active bullets, counted from the free-slot bitmask.
+
+        Returns:
+            int: The number of active bullets.
+        """
+        return self.max_bullets - bin(self._free_mask).count('1')
+
+    def clear_bullets(self):
+        """
+        Remove all of the player's bullets.
+        """
+        self._bullet_slots = [None] * self.max_bullets
+        self._free_mask = (1 << self.max_bullets) - 1
+
     def fire_bullet(self):
         """
         Fire a bullet in the current direction.
@@ -50,31 +96,22 @@ class Player:
         if self.fire_cooldown > 0:
             return None
 
-        # Check if the player has reached the maximum number of bullets
-        if len(self.bullets) >= self.max_bullets:
+        # Check if the player has reached the maximum number of bullets (no free slot)
+        free_mask = self._free_mask
+        if not free_mask:
             return None
 
-        # Fire a bullet
-        from common.bullet import Bullet
+        # Fire a bullet into the lowest free slot
         bullet = Bullet(self.position, self.direction, owner=self)
-        self.bullets.append(bullet)
+        slot = (free_mask & -free_mask).bit_length() - 1
+        self._bullet_slots[slot] = bullet
+        self._free_mask = free_mask & ~(1 << slot)
 
         # Set cooldown
         self.fire_cooldown = self.fire_cooldown_max
 
         return bullet
 
-    def _get_angle_from_direction(self):
-        """
-        Convert direction vector to angle in radians.
-
-        Returns:
-            float: Angle in radians.
-        """
-        import math
-        dx, dy = self.direction
-        return math.atan2(dy, dx)
-
     def _get_direction_from_angle(self, angle):
         """
         Convert angle in radians to direction vector.
@@ -85,7 +122,6 @@ class Player:
         Returns:
             tuple: Direction vector as (dx, dy).
         """
-        import math
         return (math.cos(angle), math.sin(angle))
 
     def turn_left(self):
@@ -96,14 +132,11 @@ class Player:
         if self.rotate_cooldown > 0:
             return False
 
-        # Get current angle
-        angle = self._get_angle_from_direction()
-
-        # Rotate counter-clockwise
-        angle += self.rotation_speed
+        # Rotate counter-clockwise, the angle is kept so it doesn't have to be recomputed from the direction
+        self._angle += self.rotation_speed
 
         # Update direction
-        self.direction = self._get_direction_from_angle(angle)
+        self.direction = self._get_direction_from_angle(self._angle)
 
         # Set cooldown
         self.rotate_cooldown = self.rotate_cooldown_max
@@ -117,14 +150,11 @@ class Player:
         if self.rotate_cooldown > 0:
             return False
 
-        # Get current angle
-        angle = self._get_angle_from_direction()
-
-        # Rotate clockwise
-        angle -= self.rotation_speed
+        # Rotate clockwise, the angle is kept so it doesn't have to be recomputed from the direction
+        self._angle -= self.rotation_speed
 
         # Update direction
-        self.direction = self._get_direction_from_angle(angle)
+        self.direction = self._get_direction_from_angle(self._angle)
 
         # Set cooldown
         self.rotate_cooldown = self.rotate_cooldown_max
@@ -145,36 +175,8 @@ class Player:
             return False
 
         dx, dy = self.direction
-        new_x = self.position[0] + dx * self.movement_speed
-        new_y = self.position[1] + dy * self.movement_speed
-
-        # Check if the new position is valid using the rectangle hitbox
-        if game_map.is_rectangle_valid(new_x, new_y, self.width, self.height):
-            self.position = (new_x, new_y)
-            self.move_cooldown = self.move_cooldown_max
-            return True
-        else:
-            # Try sliding horizontally (keeping y the same)
-            horizontal_x = new_x
-            horizontal_y = self.position[1]
-            horizontal_valid = game_map.is_rectangle_valid(horizontal_x, horizontal_y, self.width, self.height)
-
-            # Try sliding vertically (keeping x the same)
-            vertical_x = self.position[0]
-            vertical_y = new_y
-            vertical_valid = game_map.is_rectangle_valid(vertical_x, vertical_y, self.width, self.height)
-
-            # Choose one of the valid sliding directions
-            if horizontal_valid:
-                self.position = (horizontal_x, horizontal_y)
-                self.move_cooldown = self.move_cooldown_max
-                return True
-            elif vertical_valid:
-                self.position = (vertical_x, vertical_y)
-                self.move_cooldown = self.move_cooldown_max
-                return True
-
-            return False
+        speed = self.movement_speed
+        return self._move_by(game_map, dx * speed, dy * speed)
 
     def move_backward(self, game_map):
         """
@@ -191,37 +193,59 @@ class Player:
             return False
 
         dx, dy = self.direction
-        new_x = self.position[0] - dx * self.movement_speed
-        new_y = self.position[1] - dy * self.movement_speed
+        speed = self.movement_speed
+        return self._move_by(game_map, -dx * speed, -dy * speed)
+
+    def _move_by(self, game_map, step_x, step_y):
+        """
+        Move the player by a step if possible, otherwise try to slide along the wall.
+
+        Args:
+            game_map (Map): The game map to check for collisions.
+            step_x (float): The movement along the x axis.
+            step_y (float): The movement along the y axis.
+
+        Returns:
+            bool: True if the move was successful, False otherwise.
+        """
+        x, y = self.position
+        offsets = self._hitbox_offsets
+        is_rectangle_valid = game_map.is_rectangle_valid_offsets
+        new_x = x + step_x
+        new_y = y + step_y
 
         # Check if the new position is valid using the rectangle hitbox
-        if game_map.is_rectangle_valid(new_x, new_y, self.width, self.height):
+        if is_rectangle_valid(new_x, new_y, offsets):
             self.position = (new_x, new_y)
-            self.move_cooldown = self.move_cooldown_max
-            return True
+        # Try sliding horizontally (keeping y the same), then vertically (keeping x the same)
+        elif is_rectangle_valid(new_x, y, offsets):
+            self.position = (new_x, y)
+        elif is_rectangle_valid(x, new_y, offsets):
+            self.position = (x, new_y)
         else:
-            # Try sliding horizontally (keeping y the same)
-            horizontal_x = new_x
-            horizontal_y = self.position[1]
-            horizontal_valid = game_map.is_rectangle_valid(horizontal_x, horizontal_y, self.width, self.height)
-
-            # Try sliding vertically (keeping x the same)
-            vertical_x = self.position[0]
-            vertical_y = new_y
-            vertical_valid = game_map.is_rectangle_valid(vertical_x, vertical_y, self.width, self.height)
-
-            # Choose one of the valid sliding directions
-            if horizontal_valid:
-                self.position = (horizontal_x, horizontal_y)
-                self.move_cooldown = self.move_cooldown_max
-                return True
-            elif vertical_valid:
-                self.position = (vertical_x, vertical_y)
-                self.move_cooldown = self.move_cooldown_max
-                return True
-
             return False
 
+        self.move_cooldown = self.move_cooldown_max
+        return True
+
+    def update_bullets(self, game_map, players, player_hash=None):
+        """
+        Update the player's bullets for one tick, freeing the slots of the ones that are gone.
+
+        Args:
+            game_map (Map): The game map to check for wall collisions.
+            players (list): List of Player objects to check for player collisions.
+            player_hash (SpatialHash): Optional index of the alive players, see Bullet.update.
+        """
+        if self._free_mask == (1 << self.max_bullets) - 1:
+            return  # No active bullets
+
+        slots = self._bullet_slots
+        for slot, bullet in enumerate(slots):
+            if bullet is not None and not bullet.update(game_map, players, player_hash):
+                slots[slot] = None
+                self._free_mask |= 1 << slot
+
     def wall_collision_check(self, game_map):
         """
         Check if the player is colliding with a wall.
@@ -233,7 +257,7 @@ class Player:
             bool: True if the player is colliding with a wall, False otherwise.
         """
         # Check if the current position is valid using the rectangle hitbox
-        return not game_map.is_rectangle_valid(self.position[0], self.position[1], self.width, self.height)
+        return not game_map.is_rectangle_valid_offsets(self.position[0], self.position[1], self._hitbox_offsets)
 
     def update(self):
         """
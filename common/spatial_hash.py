@@ -0,0 +1,67 @@
+import math
+
+
+class SpatialHash:
+    """
+    Buckets objects by the grid cell their position falls in, so the objects
+    near a point can be found without checking every object.
+    """
+    def __init__(self, cell_size=1.0):
+        """
+        Initialize an empty spatial hash.
+
+        Args:
+            cell_size (float): The width and height of a cell, in map cells.
+        """
+        self.cell_size = cell_size
+        self.cells = {}  # Maps (cell_x, cell_y) to a list of items
+
+    def clear(self):
+        """
+        Remove all items, so the hash can be rebuilt for the next tick.
+        """
+        self.cells.clear()
+
+    def insert(self, x, y, item):
+        """
+        Add an item at a position.
+
+        Args:
+            x (float): The x-coordinate of the item.
+            y (float): The y-coordinate of the item.
+            item: The item to store.
+        """
+        cell_size = self.cell_size
+        cell = (math.floor(x / cell_size), math.floor(y / cell_size))
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            self.cells[cell] = [item]
+        else:
+            bucket.append(item)
+
+    def query(self, x, y, radius):
+        """
+        Find the items that may be within a distance of a position.
+        The result is a superset: every item in a cell overlapping the square
+        around the position is returned, the caller does the exact test.
+
+        Args:
+            x (float): The x-coordinate to search around.
+            y (float): The y-coordinate to search around.
+            radius (float): The search distance.
+
+        Returns:
+            list: The items in the cells around the position.
+        """
+        cell_size = self.cell_size
+        cells = self.cells
+        min_cell_y = math.floor((y - radius) / cell_size)
+        max_cell_y = math.floor((y + radius) / cell_size)
+
+        items = []
+        for cell_x in range(math.floor((x - radius) / cell_size), math.floor((x + radius) / cell_size) + 1):
+            for cell_y in range(min_cell_y, max_cell_y + 1):
+                bucket = cells.get((cell_x, cell_y))
+                if bucket:
+                    items.extend(bucket)
+        return items
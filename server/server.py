@@ -1,23 +1,42 @@
+import logging
+import os
+import queue
+import socket
 import sys
 import time
 import threading
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 # Add parent directory to path to import common modules
 sys.path.append(str(Path(__file__).parent.parent))
 
 from common.game import Game
-from common.network import NetworkManager, NetworkMessage
+from common.network import NetworkManager, MessagePool
 from common.network import (
     MSG_TYPE_JOIN, MSG_TYPE_LEAVE, MSG_TYPE_ACTION, 
     MSG_TYPE_STATE, MSG_TYPE_START, MSG_TYPE_END, MSG_TYPE_READY, MSG_TYPE_RESTART
 )
 
+# Number of recent sleeps whose oversleep is tracked by the game loop
+OVERSLEEP_HISTORY = 64
+
+# Seconds a receiver thread waits for client messages before checking if the server stopped
+RECEIVE_TIMEOUT = 0.25
+
+# Kernel tick timers (Linux, Python 3.13+), otherwise the game loop sleeps itself
+HAS_TIMERFD = hasattr(os, 'timerfd_create')
+
+# Most actions applied from one message: a client sends at most one movement,
+# one rotation and one fire action per frame
+MAX_ACTIONS_PER_MESSAGE = 3
+
 class GameServer:
     """
     The main game server that manages the game and client connections.
     """
-    def __init__(self, host='0.0.0.0', port=12345, tick_rate=60, max_players=4):
+    def __init__(self, host='0.0.0.0', port=12345, tick_rate=60, max_players=4, receiver_threads=1):
         """
         Initialize the game server.
 
@@ -26,6 +45,9 @@ class GameServer:
             port (int): The port to use.
             tick_rate (int): Number of game ticks per second.
             max_players (int): Maximum number of players allowed in the game.
+            receiver_threads (int): Number of threads receiving client messages, each on
+                its own socket bound to the port with SO_REUSEPORT. Needs SO_REUSEPORT
+                support (Linux, BSD), otherwise a single thread is used.
         """
         self.host = host
         self.port = port
@@ -33,29 +55,85 @@ class GameServer:
         self.tick_interval = 1.0 / tick_rate
         self.max_players = max_players
 
-        self.network = NetworkManager(True, host, port)
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            receiver_threads = 1
+        reuse_port = receiver_threads > 1
+
+        # All messages are sent from the main socket, the extra ones only receive
+        self.network = NetworkManager(True, host, port, reuse_port)
+        bound_port = self.network.socket.getsockname()[1]
+        self.receivers = [self.network] + [
+            NetworkManager(True, host, bound_port, reuse_port)
+            for _ in range(receiver_threads - 1)
+        ]
+        self.receiver_threads = []
+        self._lock = threading.Lock()  # Held while a client message is processed
+        self.message_pool = MessagePool()  # Reused messages for everything the server sends
         self.game = Game(max_players=max_players, tick_rate=tick_rate)
 
         self.running = False
         self.game_thread = None
+        self.sender_thread = None
+
+        # Log records are queued and written by a listener thread, so no thread
+        # handling the game or clients waits for stdout
+        self._log = logging.getLogger("tanks.server")
+        self._log.setLevel(logging.INFO)
+        self._log_handler = None
+        self._log_listener = None
         self.player_names = {}  # Maps player_id to player name
-        self.ready_players = set()  # Set of player_ids that are ready
+        self._player_addresses = []  # Client address of each player_id, the reverse of network.clients
+        self._address_strings = {}  # Maps client address to its "host:port" string
+        self.ready_players = [False] * max_players  # Whether each player_id is ready
+
+        # Recent oversleeps of time.sleep in the game loop (ring buffer) and the largest of them,
+        # the loop sleeps that much less and spins for the rest to start ticks on time
+        self._oversleeps = [0.0] * OVERSLEEP_HISTORY
+        self._oversleep_index = 0
+        self._worst_oversleep = 0.0
+
+        # Messages from the game loop waiting to be sent by the sender thread, as
+        # (message, address) tuples, and an event set when messages are added
+        self._outgoing = deque()
+        self._outgoing_event = threading.Event()
+
+        # Full game state sent to clients when they join or a game starts, refilled
+        # in place each time (it is serialized before it is sent again)
+        self._state_buf = {}
+
+        # Player list of the START message and the serialized START message,
+        # built on first use and cleared when a player joins, leaves or is renamed
+        self._roster_cache = None
+        self._start_bytes = None
 
     def start(self):
         """
         Start the game server.
         """
+        self._start_logging()
+
         self.running = True
         self.game_thread = threading.Thread(target=self._game_loop)
         self.game_thread.daemon = True
         self.game_thread.start()
 
-        print(f"Game server started on {self.host}:{self.port}")
+        self.sender_thread = threading.Thread(target=self._sender_loop)
+        self.sender_thread.daemon = True
+        self.sender_thread.start()
+
+        # The extra receivers get their own threads, this thread handles the main socket
+        for receiver in self.receivers[1:]:
+            receiver_thread = threading.Thread(target=self._handle_clients, args=(receiver,))
+            receiver_thread.daemon = True
+            receiver_thread.start()
+            self.receiver_threads.append(receiver_thread)
+
+        self._log.info("Game server started on %s:%s", self.host, self.port)
 
         try:
-            self._handle_clients()
+            self._handle_clients(self.network)
         except KeyboardInterrupt:
-            print("Server shutting down...")
+            self._log.info("Server shutting down...")
         finally:
             self.stop()
 
@@ -66,60 +144,224 @@ class GameServer:
         self.running = False
         if self.game_thread:
             self.game_thread.join(timeout=1.0)
-        self.network.close()
-        print("Server stopped")
+        if self.sender_thread:
+            self._outgoing_event.set()  # Wake the sender thread so it sees running is False
+            self.sender_thread.join(timeout=1.0)
+        for receiver_thread in self.receiver_threads:
+            receiver_thread.join(timeout=1.0)
+        for receiver in self.receivers:
+            receiver.close()
+        self._log.info("Server stopped")
+        self._stop_logging()
+
+    def _start_logging(self):
+        """
+        Start the listener thread that writes the server's log records to stdout.
+        """
+        log_queue = queue.SimpleQueue()
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self._log_handler = QueueHandler(log_queue)
+        self._log.addHandler(self._log_handler)
+        self._log_listener = QueueListener(log_queue, stream_handler)
+        self._log_listener.start()
+
+    def _stop_logging(self):
+        """
+        Write the remaining log records and stop the listener thread.
+        """
+        if self._log_listener:
+            self._log.removeHandler(self._log_handler)
+            self._log_listener.stop()
+            self._log_listener = None
 
     def _game_loop(self):
         """
         The main game loop that updates the game state at a fixed rate.
         """
-        last_tick_time = time.time()
+        if HAS_TIMERFD:
+            self._game_loop_timerfd()
+        else:
+            self._game_loop_sleep()
+
+    def _game_loop_timerfd(self):
+        """
+        Game loop driven by a kernel timer, which expires every tick without drifting.
+        Each read blocks until the next expiration and returns how many expirations
+        happened since the previous read.
+        """
+        timer_fd = os.timerfd_create(time.CLOCK_MONOTONIC)
+        try:
+            os.timerfd_settime(timer_fd, initial=self.tick_interval, interval=self.tick_interval)
+
+            # Bound once, they are used every tick
+            read = os.read
+            byteorder = sys.byteorder
+            tick = self._tick
+
+            while self.running:
+                expirations = int.from_bytes(read(timer_fd, 8), byteorder)
+
+                # If ticks were missed, still simulate them, but only send the last state
+                for _ in range(expirations - 1):
+                    tick(send_state=False)
+                tick()
+        finally:
+            os.close(timer_fd)
+
+    def _game_loop_sleep(self):
+        """
+        Game loop that waits for each tick itself, see _wait_until.
+        """
+        clock = time.perf_counter  # Monotonic, and the highest resolution clock
+        tick_interval = self.tick_interval
+        wait_until = self._wait_until  # Bound once, they are used every tick
+        tick = self._tick
+        next_tick_time = clock()
 
         while self.running:
-            current_time = time.time()
-            elapsed = current_time - last_tick_time
-
-            if elapsed >= self.tick_interval:
-                # Update game state
-                if self.game.is_running:
-                    game_running = self.game.update()
-
-                    # Send game state to all clients
-                    state_message = NetworkMessage(MSG_TYPE_STATE, self.game.get_state())
-                    self.network.send_message(state_message)
-
-                    # If the game just ended, send an END message
-                    if not game_running:
-                        # Get the last player from defeated_players (the winner)
-                        winner = None
-                        if self.game.defeated_players:
-                            winner = self.game.defeated_players[-1].name
-
-                        # Send end message to all clients
-                        end_message = NetworkMessage(MSG_TYPE_END, {
-                            'winner': winner
-                        })
-                        self.network.send_message(end_message)
-                        print(f"Game ended. Winner: {winner}")
-
-                last_tick_time = current_time
-            else:
-                # Sleep to reduce CPU usage
-                time.sleep(max(0, self.tick_interval - elapsed))
-
-    def _handle_clients(self):
+            wait_until(next_tick_time)
+            tick()
+
+            # Schedule from the previous tick rather than from now, so the tick rate doesn't drift
+            next_tick_time += tick_interval
+
+            # If the loop fell more than a tick behind, skip the missed ticks instead of
+            # running them back to back, which would only put it further behind
+            now = clock()
+            while next_tick_time + tick_interval < now:
+                next_tick_time += tick_interval
+
+    def _tick(self, send_state=True):
         """
-        Handle client connections and messages.
+        Run one game tick and send the resulting state to all clients.
+
+        Args:
+            send_state (bool): False to skip sending the state, when catching up on missed ticks.
+                The END message is always sent.
+        """
+        game = self.game
+
+        # Update game state
+        if not game.is_running:
+            return
+
+        game_running, winner_player = game.update()
+
+        # Send game state changes to all clients
+        if send_state or not game_running:
+            self._queue_message(MSG_TYPE_STATE, game.get_state(delta=True))
+
+        # If the game just ended, send an END message
+        if not game_running:
+            winner = winner_player.name if winner_player else None
+
+            # Send end message to all clients
+            self._queue_message(MSG_TYPE_END, {
+                'winner': winner
+            })
+            self._log.info("Game ended. Winner: %s", winner)
+
+    def _send(self, msg_type, data, address=None):
         """
+        Send a message now, using a message from the pool.
+
+        Args:
+            msg_type (int): The type of message.
+            data (dict): The message data.
+            address (tuple): The address to send to, or None to broadcast to all clients.
+        """
+        message = self.message_pool.acquire(msg_type, data)
+        self.network.send_message(message, address)
+        self.message_pool.release(message)
+
+    def _queue_message(self, msg_type, data, address=None):
+        """
+        Queue a message for the sender thread, so the game loop doesn't wait for sends.
+        The sender thread returns the message to the pool once it is sent.
+
+        Args:
+            msg_type (int): The type of message.
+            data (dict): The message data.
+            address (tuple): The address to send to, or None to broadcast to all clients.
+        """
+        self._outgoing.append((self.message_pool.acquire(msg_type, data), address))
+        self._outgoing_event.set()
+
+    def _sender_loop(self):
+        """
+        Send the messages queued by the game loop, in order.
+        """
+        outgoing = self._outgoing
+        outgoing_event = self._outgoing_event
+        send_message = self.network.send_message
+        release = self.message_pool.release
+
         while self.running:
-            message, address = self.network.receive_message()
+            outgoing_event.wait()
+            outgoing_event.clear()
 
-            if message is None:
-                # No message received, sleep briefly to reduce CPU usage
-                time.sleep(0.001)
-                continue
+            while outgoing:
+                message, address = outgoing.popleft()
+                send_message(message, address)
+                release(message)
 
-            self._process_message(message, address)
+    def _wait_until(self, deadline):
+        """
+        Wait until the deadline. Sleeps while more time is left than the worst recent
+        oversleep, then spins for the rest, so the wait neither ends late nor busy-waits long.
+
+        Args:
+            deadline (float): The time.perf_counter() value to wait for.
+        """
+        clock = time.perf_counter
+        remaining = deadline - clock()
+
+        if remaining > self._worst_oversleep:
+            requested = remaining - self._worst_oversleep
+            sleep_start = clock()
+            time.sleep(requested)
+            self._record_oversleep(clock() - sleep_start - requested)
+
+        # Spin for the last part
+        while clock() < deadline:
+            pass
+
+    def _record_oversleep(self, oversleep):
+        """
+        Add an oversleep to the ring buffer of recent ones and update the worst one.
+
+        Args:
+            oversleep (float): How many seconds longer than requested the sleep took.
+        """
+        oversleeps = self._oversleeps
+        index = self._oversleep_index
+        evicted = oversleeps[index]
+        oversleeps[index] = oversleep
+        self._oversleep_index = (index + 1) % OVERSLEEP_HISTORY
+
+        if oversleep >= self._worst_oversleep:
+            self._worst_oversleep = oversleep
+        elif evicted == self._worst_oversleep:
+            # The worst one left the buffer, find the next worst
+            self._worst_oversleep = max(oversleeps)
+
+    def _handle_clients(self, receiver):
+        """
+        Handle client connections and messages.
+
+        Args:
+            receiver (NetworkManager): The network manager to receive messages from.
+        """
+        while self.running:
+            # Block until messages arrive; the timeout only bounds how long stopping takes
+            messages = receiver.receive_messages_batch(timeout=RECEIVE_TIMEOUT)
+
+            # Several receiver threads may handle messages, one message at a time
+            with self._lock:
+                for message, address in messages:
+                    self._process_message(message, address)
 
     def _process_message(self, message, address):
         """
@@ -148,63 +390,71 @@ class GameServer:
             message (NetworkMessage): The join message.
             address (tuple): The client's address.
         """
-        player_name = message.data.get('name', f"Player_{len(self.game.players) + 1}")
+        player_name = message.data.get('name')
+        if player_name is None:
+            player_name = f"Player_{len(self.game.players) + 1}"
+
+        player_id = self.network.clients.get(address)
+        if player_id is not None:
+            # The client has already joined (a repeated JOIN), keep its player and only update the name
+            self.game.players[player_id].name = player_name
+            self.player_names[player_id] = player_name
+            self._invalidate_roster()
+            self._send_join_accept(player_id, address)
+            return
 
         # Check if the game is full
         if len(self.game.players) >= self.max_players:
             # Send rejection message
-            reject_message = NetworkMessage(MSG_TYPE_JOIN, {
+            self._send(MSG_TYPE_JOIN, {
                 'success': False,
                 'reason': 'Game is full'
-            })
-            self.network.send_message(reject_message, address)
+            }, address)
             return
 
         # Add player to the game
-        player = self.game.add_player(player_name, str(address))
-        player_id = self.game.players.index(player)
+        self.game.add_player(player_name, self._address_string(address))
+        player_id = len(self.game.players) - 1  # add_player appends the new player
 
-        # Add client to network manager
+        # Add client to network manager, the player_ids stay contiguous
         self.network.add_client(address, player_id)
+        self._player_addresses.append(address)
         self.player_names[player_id] = player_name
-
-        # Update player_ids to match indices in game.players
-        self._update_player_ids()
-
-        # Get the updated player_id after _update_player_ids
-        player_id = self.network.clients.get(address, player_id)
+        self._invalidate_roster()
 
         # Send acceptance message
-        accept_message = NetworkMessage(MSG_TYPE_JOIN, {
-            'success': True,
-            'player_id': player_id,
-            'player_count': len(self.game.players),
-            'max_players': self.max_players
-        })
-        self.network.send_message(accept_message, address)
+        self._send_join_accept(player_id, address)
 
-        print(f"Player {player_name} joined the game (ID: {player_id})")
+        self._log.info("Player %s joined the game (ID: %s)", player_name, player_id)
 
         # If the game is already running, mark the player as ready
         if self.game.is_running:
             # Mark player as ready
-            self.ready_players.add(player_id)
-            print(f"Player {player_name} is automatically ready (joined mid-game)")
-
-            # Send start message to the new player
-            start_message = NetworkMessage(MSG_TYPE_START, {
-                'players': [
-                    {'id': i, 'name': p.name}
-                    for i, p in enumerate(self.game.players)
-                ]
-            })
-            self.network.send_message(start_message, address)
+            self.ready_players[player_id] = True
+            self._log.info("Player %s is automatically ready (joined mid-game)", player_name)
 
-            # Send game state to the new player
-            state_message = NetworkMessage(MSG_TYPE_STATE, self.game.get_state())
-            self.network.send_message(state_message, address)
+            # Send the start message and the game state to the new player
+            self._send_start(address)
+            self._send_state(address)
         # Otherwise, the game will start only when at least 2 real players have joined and are ready
 
+    def _send_join_accept(self, player_id, address):
+        """
+        Send the JOIN acceptance to a client.
+
+        Args:
+            player_id (int): The player ID assigned to the client.
+            address (tuple): The client's address.
+        """
+        self._send(MSG_TYPE_JOIN, {
+            'success': True,
+            'player_id': player_id,
+            'player_count': len(self.game.players),
+            'max_players': self.max_players,
+            'tick_rate': self.tick_rate,
+            'map': self.game.get_map_state()
+        }, address)
+
     def _handle_leave(self, address):
         """
         Handle a leave message from a client.
@@ -213,22 +463,22 @@ class GameServer:
             address (tuple): The client's address.
         """
         player_id = self.network.remove_client(address)
+        self._address_strings.pop(address, None)
 
         if player_id is not None and player_id < len(self.game.players):
             player = self.game.players[player_id]
-            player_name = self.player_names.get(player_id, f"Player_{player_id}")
+            player_name = self._player_name(player_id)
 
             # Remove player from ready players
-            self.ready_players.discard(player_id)
+            self.ready_players[player_id] = False
 
             # Eliminate player from the game
             self.game.eliminate_player(player)
 
-            # Update player_ids to match indices in game.players
-            if self.network.clients:  # Only update if there are still clients connected
-                self._update_player_ids()
+            # Remove the player, keeping the player_ids contiguous
+            self._remove_player_id(player_id)
 
-            print(f"Player {player_name} left the game (ID: {player_id})")
+            self._log.info("Player %s left the game (ID: %s)", player_name, player_id)
 
     def _handle_action(self, message, address):
         """
@@ -240,52 +490,152 @@ class GameServer:
         """
         player_id = self.network.clients.get(address)
 
-        if player_id is not None and self.game.is_running:
-            action = message.data
-            self.game.process_player_action(player_id, action)
-
-    def _update_player_ids(self):
-        """
-        Update player_ids in network.clients dictionary to match indices in game.players list.
-        This ensures that player_ids are always consistent between client and server.
-        """
-        # Store old player_ids to track changes
-        old_player_ids = {addr: player_id for addr, player_id in self.network.clients.items()}
-
-        # Make sure game.players only contains players that correspond to connected clients
-        connected_player_ids = set(self.network.clients.values())
-        self.game.players = [p for i, p in enumerate(self.game.players) if i in connected_player_ids]
-
-        # Simply assign sequential IDs to all connected clients
-        addresses = list(self.network.clients.keys())
-        for i, addr in enumerate(addresses):
-            if i < len(self.game.players):
-                self.network.clients[addr] = i
-                self.game.players[i].ip_address = str(addr)  # Update player's IP address to match
-
-        # Update player_names dictionary
-        new_player_names = {}
-        for addr, player_id in self.network.clients.items():
-            if player_id < len(self.game.players):
-                new_player_names[player_id] = self.game.players[player_id].name
-
-        self.player_names = new_player_names
-
-        print(f"Updated player IDs: {self.network.clients}")
-
-        # Notify clients of their new player_ids if they've changed
-        for addr, new_player_id in self.network.clients.items():
-            old_player_id = old_player_ids.get(addr)
-            if old_player_id is not None and old_player_id != new_player_id:
-                # Send a message to the client with their new player_id
-                update_message = NetworkMessage(MSG_TYPE_JOIN, {
-                    'success': True,
-                    'player_id': new_player_id,
-                    'player_count': len(self.game.players),
-                    'max_players': self.max_players
-                })
-                self.network.send_message(update_message, addr)
-                print(f"Notified client at {addr} of new player_id: {new_player_id} (was {old_player_id})")
+        if player_id is None or not self.game.is_running:
+            return
+
+        # A message carries either a batch of actions or a single action
+        data = message.data
+        if not isinstance(data, dict):
+            return
+        actions = data.get('actions', [data])
+        if not isinstance(actions, list):
+            return
+
+        # Only a few actions are applied per message, so a client can't move
+        # many steps in one tick by packing more actions into a message
+        for action in actions[:MAX_ACTIONS_PER_MESSAGE]:
+            if isinstance(action, dict):
+                self.game.process_player_action(player_id, action)
+
+    def _player_name(self, player_id):
+        """
+        Get the name of a player, with a placeholder built only if the name is unknown.
+
+        Args:
+            player_id (int): The player's ID.
+
+        Returns:
+            str: The player's name.
+        """
+        player_name = self.player_names.get(player_id)
+        if player_name is None:
+            player_name = f"Player_{player_id}"
+        return player_name
+
+    def _address_string(self, address):
+        """
+        Get the "host:port" string of a client address, formatted once per address.
+
+        Args:
+            address (tuple): The client's address.
+
+        Returns:
+            str: The address as "host:port".
+        """
+        address_string = self._address_strings.get(address)
+        if address_string is None:
+            address_string = self._address_strings[address] = f"{address[0]}:{address[1]}"
+        return address_string
+
+    def _remove_player_id(self, player_id):
+        """
+        Remove a player that left, keeping player_ids equal to the indices in game.players.
+        The last player takes the freed player_id (swap and pop), so at most one
+        client's player_id changes, and only that client is notified.
+
+        Args:
+            player_id (int): The player_id of the player that left.
+        """
+        # Work on a copy and assign it at the end: the game thread iterates
+        # game.players without holding the lock, so the list it has must not change
+        players = list(self.game.players)
+        last_id = len(players) - 1
+
+        if player_id != last_id:
+            # Move the last player into the freed slot
+            moved_address = self._player_addresses[last_id]
+            players[player_id] = players[last_id]
+            self._player_addresses[player_id] = moved_address
+            self.player_names[player_id] = self.player_names.get(last_id)
+            self.network.clients[moved_address] = player_id
+            self.ready_players[player_id] = self.ready_players[last_id]
+            self.ready_players[last_id] = False
+
+        players.pop()
+        self.game.players = players
+        self._player_addresses.pop()
+        self.player_names.pop(last_id, None)
+        self._invalidate_roster()
+
+        self._log.debug("Updated player IDs: %s", self.network.clients)
+
+        if player_id != last_id:
+            # Send a message to the moved client with their new player_id
+            self._send(MSG_TYPE_JOIN, {
+                'success': True,
+                'player_id': player_id,
+                'player_count': len(players),
+                'max_players': self.max_players
+            }, moved_address)
+            self._log.info("Notified client at %s of new player_id: %s (was %s)",
+                           self._address_string(moved_address), player_id, last_id)
+
+    def _send_start(self, address=None):
+        """
+        Send the START message with the player list and the map.
+
+        Args:
+            address (tuple): The address to send to, or None to broadcast to all clients.
+        """
+        self.network.send_prepared(self._get_start_bytes(), address)
+
+    def _send_state(self, address=None):
+        """
+        Send the full game state.
+
+        Args:
+            address (tuple): The address to send to, or None to broadcast to all clients.
+        """
+        self._send(MSG_TYPE_STATE, self.game.get_state_into(self._state_buf), address)
+
+    def _roster(self):
+        """
+        Get the player list sent in the START message, rebuilt only after
+        _invalidate_roster was called.
+
+        Returns:
+            list: The players as {'id': player_id, 'name': name} dicts.
+        """
+        if self._roster_cache is None:
+            self._roster_cache = [
+                {'id': i, 'name': p.name}
+                for i, p in enumerate(self.game.players)
+            ]
+        return self._roster_cache
+
+    def _invalidate_roster(self):
+        """
+        Clear the cached player list and START message, after the players changed.
+        """
+        self._roster_cache = None
+        self._start_bytes = None
+
+    def _get_start_bytes(self):
+        """
+        Get the serialized START message. It only changes when the players do, since
+        the map stays the same, so it is reused until the roster is invalidated.
+
+        Returns:
+            bytes: The START message with the player list and the map.
+        """
+        if self._start_bytes is None:
+            start_message = self.message_pool.acquire(MSG_TYPE_START, {
+                'players': self._roster(),
+                'map': self.game.get_map_state()
+            })
+            self._start_bytes = start_message.to_bytes()
+            self.message_pool.release(start_message)
+        return self._start_bytes
 
     def _handle_ready(self, address):
         """
@@ -298,30 +648,21 @@ class GameServer:
 
         if player_id is not None:
             # Mark player as ready
-            self.ready_players.add(player_id)
-            print(f"Player {self.player_names.get(player_id, f'Player_{player_id}')} is ready")
+            self.ready_players[player_id] = True
+            self._log.info("Player %s is ready", self._player_name(player_id))
 
             # Check if we have at least 2 ready players
-            if len(self.ready_players) >= 2 and not self.game.is_running:
-                # Update player_ids to match indices in game.players
-                self._update_player_ids()
-
+            ready_count = sum(self.ready_players)
+            if ready_count >= 2 and not self.game.is_running:
                 # Send start message to all clients
-                start_message = NetworkMessage(MSG_TYPE_START, {
-                    'players': [
-                        {'id': i, 'name': p.name}
-                        for i, p in enumerate(self.game.players)
-                    ]
-                })
-                self.network.send_message(start_message)
+                self._send_start()
 
                 # Start the game
                 self.game.start_game()
-                print("Game started with", len(self.ready_players), "players")
+                self._log.info("Game started with %s players", ready_count)
 
                 # Send game state to all clients
-                state_message = NetworkMessage(MSG_TYPE_STATE, self.game.get_state())
-                self.network.send_message(state_message)
+                self._send_state()
 
     def _handle_restart(self, address):
         """
@@ -336,27 +677,15 @@ class GameServer:
             # Only restart if the game is not running (has ended)
             if not self.game.is_running:
                 # Reset ready players
-                self.ready_players.clear()
-
-                # Update player_ids to match indices in game.players
-                self._update_player_ids()
+                self.ready_players = [False] * self.max_players
 
                 success = self.game.restart_game()
                 if success:
-                    print("Game restarted")
-
-                    # Send start message to all clients
-                    start_message = NetworkMessage(MSG_TYPE_START, {
-                        'players': [
-                            {'id': i, 'name': p.name}
-                            for i, p in enumerate(self.game.players)
-                        ]
-                    })
-                    self.network.send_message(start_message)
+                    self._log.info("Game restarted")
 
-                    # Send game state to all clients
-                    state_message = NetworkMessage(MSG_TYPE_STATE, self.game.get_state())
-                    self.network.send_message(state_message)
+                    # Send start message and game state to all clients
+                    self._send_start()
+                    self._send_state()
 
 if __name__ == "__main__":
     import argparse
@@ -366,8 +695,10 @@ if __name__ == "__main__":
     parser.add_argument("--port", type=int, default=12345, help="Port to use")
     parser.add_argument("--tick-rate", type=int, default=60, help="Game tick rate")
     parser.add_argument("--max-players", type=int, default=4, help="Maximum number of players")
+    parser.add_argument("--receiver-threads", type=int, default=1,
+                        help="Number of threads receiving client messages (needs SO_REUSEPORT)")
 
     args = parser.parse_args()
 
-    server = GameServer(args.host, args.port, args.tick_rate, args.max_players)
+    server = GameServer(args.host, args.port, args.tick_rate, args.max_players, args.receiver_threads)
     server.start()